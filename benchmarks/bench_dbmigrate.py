@@ -0,0 +1,271 @@
+"""
+Benchmarks for the planning and execution phases of dbmigrate.
+
+Generates a synthetic repository with a configurable number of migrations and scripts, times each phase and writes
+the results as JSON. A previous result file can be passed with `--compare` to report regressions:
+
+    python benchmarks/bench_dbmigrate.py --scripts 4000 --output before.json
+    python benchmarks/bench_dbmigrate.py --scripts 4000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+
+import dbmigrate  # noqa: E402
+
+
+def generate_dependencies(count: int, fan_in: int, fan_out: int, rng: random.Random) -> Iterator[List[str]]:
+    """
+    Yields the dependencies of `count` nodes named `v<i>`. Every node depends on up to `fan_in` earlier nodes, and
+    every node is a dependency of at most `fan_out` later nodes.
+    """
+    available = []
+    capacity = {}
+    for i in range(count):
+        limit = min(fan_in, len(available))
+        depends = []
+        for _ in range(rng.randint(0, limit) if limit else 0):
+            j = rng.randrange(len(available))
+            parent = available[j]
+            if parent in depends:
+                continue
+            depends.append(parent)
+            capacity[parent] -= 1
+            if capacity[parent] == 0:
+                available[j] = available[-1]
+                available.pop()
+        yield depends
+        if fan_out > 0:
+            available.append(f"v{i}")
+            capacity[f"v{i}"] = fan_out
+
+
+def generate_graph(nodes: int, fan_in: int, fan_out: int, seed: int) -> Dict[str, List[str]]:
+    """
+    Returns a dependency graph like the one of a repository generated with `nodes` scripts, without writing files.
+    """
+    graph = {f"v{i}": [] for i in range(nodes)}
+    for i, depends in enumerate(generate_dependencies(nodes, fan_in, fan_out, random.Random(seed))):
+        for d in depends:
+            graph[d].append(f"v{i}")
+    return graph
+
+
+def generate_repository(root: Path, migrations: int, scripts: int, fan_in: int, fan_out: int, seed: int):
+    """
+    Writes `migrations` table migrations and `scripts` view scripts below `root`. Every script depends on up to
+    `fan_in` earlier scripts, and every script is a dependency of at most `fan_out` later scripts.
+    """
+    rng = random.Random(seed)
+    migrations_path = root / "migrations"
+    scripts_path = root / "scripts"
+    migrations_path.mkdir(parents=True)
+    scripts_path.mkdir(parents=True)
+
+    for i in range(migrations):
+        (migrations_path / f"{i:012d}_create_table_t{i}.sql").write_text(
+            f"-- author: bench\n\n"
+            f"create table t{i}\n(\n    id    int,\n    value varchar(40)\n);\n\n"
+            f"create index ix_t{i}_1 on t{i} (id);\n\n"
+            f"insert into t{i} (id, value) values (1, 'one');\n"
+            f"insert into t{i} (id, value) values (2, 'two; and a semicolon');\n")
+
+    # the dependencies are drawn interleaved with the tables, so a seed generates the same repository as before
+    for i, depends in enumerate(generate_dependencies(scripts, fan_in, fan_out, rng)):
+        name = f"v{i}"
+        table = f"t{rng.randrange(migrations)}" if migrations else None
+        selects = [f"select id from {d}" for d in depends]
+        if table or not selects:
+            selects.append(f"select id from {table}" if table else "select 1 as id")
+        header = f"-- depends: {', '.join(depends)}\n" if depends else ""
+        if table:
+            header += f"-- sources: {table}\n"
+        (scripts_path / f"{name}.sql").write_text(
+            f"{header}\ncreate view {name} as\n" + "\nunion all\n".join(selects) + ";\n")
+
+    # files modified within the last seconds are not cached, see ChecksumCache
+    past = time.time() - 3600
+    for f in root.rglob("*.sql"):
+        os.utime(f, (past, past))
+
+
+def measure(function: Callable, repeat: int) -> Dict[str, float]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings), "max": max(timings), "result": result}
+
+
+def run(args: argparse.Namespace) -> Dict:
+    results = {}
+
+    def phase(name: str, function: Callable, repeat: Optional[int] = None):
+        m = measure(function, repeat or args.repeat)
+        value = m.pop("result")
+        results[name] = m
+        print(f"{name:32s} min {m['min'] * 1000:10.2f} ms  median {m['median'] * 1000:10.2f} ms", file=sys.stderr)
+        return value
+
+    if args.graph_nodes:
+        graph = generate_graph(args.graph_nodes, args.fan_in, args.fan_out, args.seed)
+        phase("graph_topological_sort", lambda: dbmigrate.topological_sort(graph))
+        phase("graph_find_cycles", lambda: dbmigrate.find_cycles(graph))
+        # edges between the first and the last node in both directions close a cycle, reported by the failing sort
+        last = f"v{args.graph_nodes - 1}"
+        cyclic = dict(graph)
+        cyclic["v0"] = graph["v0"] + [last]
+        cyclic[last] = graph[last] + ["v0"]
+
+        def sort_cyclic():
+            try:
+                dbmigrate.topological_sort(cyclic)
+            except dbmigrate.CycleError as e:
+                return e
+            sys.exit("error: the cycle of the graph was not detected")
+
+        phase("graph_cycle_error", sort_cyclic)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_repository(root / "repo", args.migrations, args.scripts, args.fan_in, args.fan_out, args.seed)
+        migrations_path = root / "repo" / "migrations"
+        scripts_path = root / "repo" / "scripts"
+
+        migrations = phase("process_migrations",
+                           lambda: dbmigrate.process_migrations(migrations_path, args.io_workers))
+        scripts = phase("process_scripts", lambda: dbmigrate.process_scripts(scripts_path, args.io_workers))
+
+        cache_file = root / "cache"
+        cache = dbmigrate.ChecksumCache(cache_file)
+        dbmigrate.process_scripts(scripts_path, args.io_workers, cache)
+        cache.save()
+
+        def process_scripts_cached():
+            c = dbmigrate.ChecksumCache(cache_file)
+            c.load()
+            return dbmigrate.process_scripts(scripts_path, args.io_workers, c)
+
+        phase("process_scripts_cached", process_scripts_cached)
+
+        migration_contents = [m.contents for m in migrations]
+        split = {}
+        for name, splitter in dbmigrate.STATEMENT_SPLITTERS.items():
+            split[name] = phase(f"split_statements_{name}",
+                                lambda: [list(splitter(c.splitlines(keepends=True))) for c in migration_contents])
+        if split["fast"] != split["sqlparse"]:
+            sys.exit("error: the fast statement splitter and sqlparse split the migrations differently")
+
+        contents = [s.contents for s in scripts]
+        phase("extract_depends_on", lambda: [dbmigrate.extract_depends_on(c) for c in contents])
+        phase("extract_sources", lambda: [dbmigrate.extract_sources(c) for c in contents])
+        graph = phase("build_dependency_graph", lambda: dbmigrate.build_dependency_graph(scripts))
+        phase("topological_sort", lambda: dbmigrate.topological_sort(graph))
+
+        engine = create_engine(args.url or f"sqlite:///{root / 'bench.db'}")
+        if engine.dialect.name == "sqlite":
+            # measure dbmigrate rather than fsync latency
+            event.listen(engine, "connect", lambda c, _: c.execute("pragma synchronous = off"))
+        dbmigrate.create_migrations_log_table(engine)
+        backend = dbmigrate.DatabaseMigrationBackend(engine)
+
+        def execute_migrations():
+            for m in migrations:
+                backend.execute_migration(m)
+
+        phase("execute_migrations", execute_migrations, repeat=1)
+        script_map = {s.name: s for s in scripts}
+        phase("execute_scripts", lambda: dbmigrate.execute_scripts(backend, graph, script_map, args.jobs), repeat=1)
+
+        checksums = phase("load_newest_checksums", lambda: dbmigrate.load_newest_checksums(engine))
+        phase("check_scripts", lambda: [dbmigrate.check_script(checksums, s.name, s.checksum) for s in scripts])
+        phase("plan_scripts", lambda: dbmigrate.plan_scripts(scripts, checksums))
+        engine.dispose()
+
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=Path(__file__).resolve().parent,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    regressions = []
+    print(f"{'phase':32s} {'baseline':>12s} {'current':>12s} {'ratio':>8s}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] > 0 else float("inf")
+        flag = " *" if ratio > threshold else ""
+        print(f"{name:32s} {before['median'] * 1000:10.2f}ms {result['median'] * 1000:10.2f}ms {ratio:8.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmarks the planning and execution phases of dbmigrate")
+    parser.add_argument("--migrations", type=int, default=500, help="number of generated migrations")
+    parser.add_argument("--scripts", type=int, default=1000, help="number of generated scripts")
+    parser.add_argument("--fan-in", type=int, default=3, help="maximum number of dependencies per script")
+    parser.add_argument("--fan-out", type=int, default=5, help="maximum number of dependents per script")
+    parser.add_argument("--graph-nodes", type=int, default=0,
+                        help="number of nodes of an in-memory dependency graph whose sorting and cycle detection is "
+                             "timed (default: 0, skipped)")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the repository generator")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of each planning phase")
+    parser.add_argument("--io-workers", type=int, default=dbmigrate.DEFAULT_IO_WORKERS)
+    parser.add_argument("--url", help="database the execution phases run against (default: temporary sqlite file)")
+    parser.add_argument("--jobs", type=int, default=1, help="number of scripts executed in parallel")
+    parser.add_argument("--output", help="file the JSON results are written to (default: stdout)")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="median ratio above which a phase is reported as a regression (default: 1.2)")
+    args = parser.parse_args()
+
+    parameters = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "threshold", "url")}
+    current = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": run(args),
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2))
+    else:
+        print(json.dumps(current, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if baseline.get("parameters") != parameters:
+            print("warning: benchmark parameters differ from the baseline", file=sys.stderr)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from dbmigrate import AsyncDatabaseMigrationBackend, ConnectionConfig, build_script_graph, create_async_connection, \
+    execute_scripts_async, process_migration, process_script, setup_log_tables
+
+pytest.importorskip("aiosqlite")
+
+
+def write_files(directory, files):
+    directory.mkdir()
+    paths = []
+    for name, contents in files.items():
+        path = directory / f"{name}.sql"
+        path.write_text(contents)
+        paths.append(path)
+    return paths
+
+
+def deploy(tmp_path, migrations, scripts, batch_statements=1, jobs=2):
+    """
+    Executes the migrations and scripts on a new aiosqlite database. Returns the exception raised by the scripts,
+    the rows of dbmigrate_log and dbmigrate_state and the values inserted into the table `hits`.
+    """
+    migrations = [process_migration(p) for p in write_files(tmp_path / "migrations", migrations)]
+    scripts = [process_script(p) for p in write_files(tmp_path / "scripts", scripts)]
+
+    async def run():
+        engine = create_async_connection(ConnectionConfig(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}"), jobs)
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(setup_log_tables)
+            backend = AsyncDatabaseMigrationBackend(engine, run_id="run-1")
+            for m in migrations:
+                await backend.execute_migration(m)
+            raised = None
+            try:
+                await execute_scripts_async(backend, build_script_graph(scripts), {s.name: s for s in scripts}, jobs,
+                                            batch_statements=batch_statements)
+            except Exception as e:
+                raised = e
+            async with engine.connect() as connection:
+                log = (await connection.execute(text("select name, status, run_id, statement_count "
+                                                     "from dbmigrate_log order by created_at, name"))).fetchall()
+                state = (await connection.execute(text("select name, checksum from dbmigrate_state"))).fetchall()
+                hits = (await connection.execute(text("select name from hits"))).fetchall()
+            return raised, log, dict(state), sorted(h.name for h in hits)
+        finally:
+            await engine.dispose()
+
+    raised, log, state, hits = asyncio.run(run())
+    return raised, log, state, hits, {m.name: m.checksum for m in migrations + scripts}
+
+
+MIGRATIONS = {"001_hits": "create table hits (name varchar(20));\ncreate table other (id int);\n"}
+
+
+def test_executes_migrations_and_scripts(tmp_path):
+    scripts = {
+        "a": "insert into hits values ('a')",
+        "b": "-- depends: a\ninsert into hits select 'b' from hits where name = 'a'",
+        "c": "-- depends: b\ninsert into hits select 'c' from hits where name = 'b'",
+    }
+    raised, log, state, hits, checksums = deploy(tmp_path, MIGRATIONS, scripts)
+
+    assert raised is None
+    assert hits == ["a", "b", "c"]
+    assert state == checksums
+    assert [(row.name, row.status, row.run_id) for row in log] == \
+           [("001_hits", "ok", "run-1"), ("a", "ok", "run-1"), ("b", "ok", "run-1"), ("c", "ok", "run-1")]
+    assert log[0].statement_count == 2
+
+
+def test_failed_script_skips_dependents(tmp_path):
+    scripts = {
+        "a": "insert into hits values ('a')",
+        "b": "-- depends: a\ninsert into missing values ('b')",
+        "c": "-- depends: b\ninsert into hits values ('c')",
+        "d": "insert into hits values ('d')",
+    }
+    raised, log, state, hits, _ = deploy(tmp_path, MIGRATIONS, scripts, jobs=1)
+
+    # b is started before d, once it has failed no further scripts are started
+    assert raised is not None and "missing" in str(raised)
+    assert hits == ["a"]
+    assert sorted(state) == ["001_hits", "a"]
+    assert [(row.name, row.status) for row in log] == [("001_hits", "ok"), ("a", "ok"), ("b", "failed")]
+
+
+def test_batch_is_bisected_on_failure(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    scripts = {f"s{i}": f"insert into hits values ('s{i}')" for i in range(8)}
+    scripts["s5"] = "insert into missing values ('s5')"
+    raised, log, state, hits, _ = deploy(tmp_path, MIGRATIONS, scripts, batch_statements=8, jobs=1)
+
+    assert raised is not None
+    assert "batch of 8 scripts failed, retrying in halves" in caplog.text
+    assert hits == [f"s{i}" for i in range(8) if i != 5]
+    assert sorted(state) == ["001_hits"] + [f"s{i}" for i in range(8) if i != 5]
+    statuses = {(row.name, row.status) for row in log}
+    assert ("s5", "failed") in statuses
+    assert all((f"s{i}", "ok") in statuses for i in range(8) if i != 5)
+    assert len([row for row in log if row.name != "001_hits"]) == 8
@@ -0,0 +1,23 @@
+from sqlalchemy import create_engine, text
+
+from dbmigrate import DatabaseMigrationBackend, create_migrations_log_table, csv_records, process_migration
+
+
+def test_csv_records():
+    lines = ['1,,"",x\n', '\n', '2,"a,b","say ""hi""\n', 'next line",\r\n']
+    assert list(csv_records(lines)) == [["1", None, "", "x"], ["2", "a,b", 'say "hi"\nnext line', None]]
+
+
+def test_loads_csv_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    create_migrations_log_table(engine)
+    with engine.begin() as connection:
+        connection.execute(text("create table person (id int, name varchar(40), note varchar(40))"))
+    path = tmp_path / "202206070900_person.csv"
+    path.write_text('id,name,note\n1,"",\n2,"Doe, John","multi\nline"\n')
+
+    DatabaseMigrationBackend(engine).execute_migration(process_migration(path))
+
+    with engine.connect() as connection:
+        rows = connection.execute(text("select id, name, note from person order by id")).fetchall()
+    assert [tuple(row) for row in rows] == [(1, "", None), (2, "Doe, John", "multi\nline")]
@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine, text
+
+from dbmigrate import coalesce_inserts, group_inserts, literal_row_values, values_statement
+
+
+def test_groups_literal_rows():
+    statements = ["insert into t (a, b) values (1, 'it''s')",
+                  "insert into t (a, b) values (-2.5, null);",
+                  "select 1",
+                  "insert into t (a, b) values (3, 'x')"]
+    assert list(group_inserts(statements, 1000)) == [
+        ("insert into t (a, b) values", ["(1, 'it''s')", "(-2.5, null)"]),
+        ("select 1", []),
+        ("insert into t (a, b) values (3, 'x')", []),
+    ]
+
+
+def test_values_statement():
+    [(prefix, rows), _] = group_inserts(["insert into t (a) values (1)", "insert into t (a) values (2)",
+                                         "select 1"], 1000)
+    assert values_statement(prefix) == "insert into t (a) values %s"
+    assert values_statement('insert into "100%" values') == 'insert into "100%%" values %s'
+    assert [literal_row_values(row) for row in rows] == [[1], [2]]
+
+
+def test_does_not_group_expressions():
+    statements = ["insert into t values ((select coalesce(max(id), 0) + 1 from t))"] * 3
+    assert list(coalesce_inserts(statements, 1000)) == statements
+
+
+def test_does_not_group_different_quoted_tables():
+    statements = ['insert into "Person" values (1)', 'insert into "person" values (2)']
+    assert list(coalesce_inserts(statements, 1000)) == statements
+
+
+def test_limits_rows():
+    statements = [f"insert into t values ({i})" for i in range(5)]
+    assert list(coalesce_inserts(statements, 2)) == [
+        "insert into t values\n(0),\n(1)", "insert into t values\n(2),\n(3)", "insert into t values (4)"]
+
+
+def test_coalesced_inserts_execute():
+    engine = create_engine("sqlite://")
+    statements = [f"insert into t (a, b) values ({i}, 'v{i}')" for i in range(10)]
+    with engine.begin() as connection:
+        connection.execute(text("create table t (a int, b varchar(10))"))
+        for statement in coalesce_inserts(statements, 4):
+            connection.execute(text(statement))
+        assert connection.execute(text("select count(*), sum(a) from t")).fetchone() == (10, 45)
@@ -0,0 +1,59 @@
+from concurrent.futures import Future
+
+import pytest
+
+from dbmigrate import BatchBisection, Script, ScriptQueue
+
+
+def script(name, contents="select 1"):
+    return Script(name, f"{name}.sql", name, name, [], [], contents)
+
+
+def resolved(value=None, exception=None):
+    future = Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(value)
+    return future
+
+
+def test_bisection_finds_failing_scripts():
+    scripts = [script(f"s{i}") for i in range(8)]
+    attempts = []
+    bisection = BatchBisection(scripts)
+    for batch in bisection:
+        names = [s.name for s in batch]
+        attempts.append(names)
+        bisection.done(batch, ValueError("boom") if {"s2", "s5"} & set(names) else None)
+
+    assert list(bisection.failures) == ["s2", "s5"]
+    assert attempts[:4] == [[f"s{i}" for i in range(8)], ["s0", "s1", "s2", "s3"], ["s0", "s1"], ["s2", "s3"]]
+    assert ["s2"] in attempts and ["s5"] in attempts
+
+
+def test_queue_takes_by_priority_and_releases_successors():
+    graph = {"a": ["c"], "b": ["c"], "c": []}
+    queue = ScriptQueue(graph, {n: script(n) for n in graph}, {"b": 2.0}, batch_statements=1)
+
+    assert [s.name for s in queue.take()] == ["b"]
+    assert [s.name for s in queue.take()] == ["a"]
+    assert not queue.startable()
+    queue.finish(["a"], resolved())
+    queue.finish(["b"], resolved({}))
+    assert [s.name for s in queue.take()] == ["c"]
+    queue.finish(["c"], resolved())
+    queue.check()
+
+
+def test_queue_stops_after_failure():
+    graph = {"a": ["b"], "b": [], "c": []}
+    queue = ScriptQueue(graph, {n: script(n) for n in graph}, batch_statements=2)
+
+    batch = queue.take()
+    assert [s.name for s in batch] == ["a", "c"]
+    queue.finish(["a", "c"], resolved({"a": ValueError("boom")}))
+    assert not queue.startable()
+    with pytest.raises(ValueError, match="boom"):
+        queue.check()
+    assert queue.done == {"c"}
@@ -0,0 +1,112 @@
+import pytest
+import sqlparse
+
+from dbmigrate import STATEMENT_SPLITTERS
+
+CORPUS = {
+    "plain": "create table person (id int, name varchar(40));\n"
+             "create index ix_person_1 on person(id);\n"
+             "insert into person values (1, 'a');\n",
+    "no trailing semicolon": "select 1;\nselect 2",
+    "empty statements": "select 1;;\n;\nselect 2;\n",
+    "line comments": "-- leading comment; with semicolon\n"
+                     "select 1; -- trailing comment\n"
+                     "select 2 -- comment; inside\n"
+                     "from t;\n"
+                     "# mysql comment;\n"
+                     "select 3;\n",
+    "block comments": "/* leading; comment */ select 1;\n"
+                      "select /* inline; */ 2;\n"
+                      "/*\n multi;\n line;\n*/\n"
+                      "select 3;\n",
+    "strings": "insert into t values ('a;b', 'it''s; ok', 'multi;\nline');\n"
+               "select \"quoted;identifier\" from t;\n"
+               "select `backtick;name` from t;\n",
+    "escape strings": "select E'it\\'s; escaped';\n"
+                      "select 'back\\\\slash;';\n"
+                      "select e'tab\\t;';\n",
+    "dollar quotes": "create function f() returns int as $$\n"
+                     "  select 1;\n"
+                     "  select 2;\n"
+                     "$$ language sql;\n"
+                     "create function g() returns text as $body$\n"
+                     "  select 'a;$$;b';\n"
+                     "$body$ language sql;\n"
+                     "select 3;\n",
+    "plpgsql": "create or replace function f(x int) returns int as $$\n"
+               "declare\n"
+               "  y int := 0;\n"
+               "begin\n"
+               "  if x > 0 then\n"
+               "    y := 1;\n"
+               "  elsif x < 0 then\n"
+               "    y := -1;\n"
+               "  end if;\n"
+               "  for i in 1..x loop\n"
+               "    y := y + i;\n"
+               "  end loop;\n"
+               "  return case when y > 10 then 10 else y end;\n"
+               "end;\n"
+               "$$ language plpgsql;\n"
+               "select f(1);\n",
+    "begin end blocks": "CREATE PROCEDURE p()\n"
+                        "BEGIN\n"
+                        "  DECLARE x INT;\n"
+                        "  IF x > 1 THEN\n"
+                        "    SELECT 1;\n"
+                        "  END IF;\n"
+                        "  WHILE x < 10 DO\n"
+                        "    SET x = x + 1;\n"
+                        "  END WHILE;\n"
+                        "  CASE x WHEN 1 THEN SELECT 1; ELSE SELECT 2; END CASE;\n"
+                        "END;\n"
+                        "SELECT 2;\n",
+    "trigger": "create trigger tr before insert on t for each row\n"
+               "begin\n"
+               "  set new.x = 1;\n"
+               "  set new.y = 2;\n"
+               "end;\n"
+               "insert into t values (1);\n",
+    "dotted keywords": "create trigger tr before update on t for each row\n"
+                       "begin\n"
+                       "  set new.v = old.end;\n"
+                       "  set new.w = t.begin + x.if + x.for + x.while;\n"
+                       "  if new.case then set new.x = 1; end if;\n"
+                       "  set new.y = old.end if;\n"
+                       "end;\n"
+                       "select t. end from t;\n"
+                       "select old.end, t.begin, new.declare from t;\n",
+    "transaction begin": "begin;\ninsert into t values (1);\ncommit;\n"
+                         "begin transaction;\nupdate t set x = 1;\nend;\n",
+    "case expressions": "select case when x = 1 then 'a;' else 'b' end from t;\n"
+                        "select (case x when 1 then 2 end);\n",
+    "keywords as names": "select t.end, begin.x from begin;\n"
+                         "select end(1);\n",
+    "crlf": "create table t (id int);\r\n"
+            "-- comment\r\n"
+            "insert into t values (1);\r\n"
+            "create function f() returns int as $$\r\n"
+            "  select 1;\r\n"
+            "$$ language sql;\r\n"
+            "/* block\r\n comment; */\r\n"
+            "select 'a;\r\nb';\r\n",
+    "parentheses": "select (1; 2);\nselect ((3));\n",
+}
+
+
+def chunkings(sql: str):
+    yield "whole", [sql]
+    yield "lines", sql.splitlines(True)
+    yield "3 characters", [sql[i:i + 3] for i in range(0, len(sql), 3)]
+
+
+CASES = [(name, chunking, chunks)
+         for name, sql in CORPUS.items()
+         for chunking, chunks in chunkings(sql)]
+
+
+@pytest.mark.parametrize("splitter", sorted(STATEMENT_SPLITTERS.keys()))
+@pytest.mark.parametrize("name,chunking,chunks", CASES, ids=[f"{name}-{chunking}" for name, chunking, _ in CASES])
+def test_splits_like_sqlparse(splitter, name, chunking, chunks):
+    expected = [statement for statement in sqlparse.split("".join(chunks)) if statement]
+    assert list(STATEMENT_SPLITTERS[splitter](chunks)) == expected
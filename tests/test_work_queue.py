@@ -0,0 +1,91 @@
+import argparse
+import threading
+
+from sqlalchemy import text
+
+from dbmigrate import ConnectionConfig, WorkQueue, build_script_graph, create_connection, process_script, \
+    setup_log_tables, work
+
+
+def publish(tmp_path, scripts):
+    """
+    Publishes the scripts as run `run-1` to a new SQLite database with the table `hits`, which records the order
+    in which scripts are executed. Returns the engine and the scripts.
+    """
+    directory = tmp_path / "scripts"
+    directory.mkdir()
+    for name, contents in scripts.items():
+        (directory / f"{name}.sql").write_text(contents)
+    scripts = [process_script(directory / f"{name}.sql") for name in scripts]
+    engine = create_connection(ConnectionConfig(f"sqlite:///{tmp_path / 'db.sqlite'}"), 4)
+    with engine.begin() as connection:
+        setup_log_tables(connection)
+        connection.execute(text("create table hits (id integer primary key autoincrement, name varchar(20))"))
+    WorkQueue(engine, "run-1").publish(build_script_graph(scripts), {s.name: s for s in scripts})
+    return engine, scripts
+
+
+def run_workers(engine, scripts, workers=2, jobs=2):
+    """
+    Runs `workers` concurrent `work` calls with `jobs` threads each, standing in for separate worker processes.
+    """
+    args = argparse.Namespace(jobs=jobs, release_contents=False, splitter="fast", insert_batch_rows=1)
+    executed = []
+    threads = [threading.Thread(target=lambda: executed.append(work(engine, args, scripts, "run-1")))
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(executed)
+
+
+def hit_order(engine):
+    with engine.connect() as connection:
+        return [row.name for row in connection.execute(text("select name from hits order by id"))]
+
+
+def queue_status(engine):
+    with engine.connect() as connection:
+        return dict(connection.execute(text("select name, status from dbmigrate_queue")).fetchall())
+
+
+def test_workers_respect_dependencies_and_claim_once(tmp_path):
+    scripts = {}
+    for chain in range(4):
+        for step in range(6):
+            depends = f"-- depends: c{chain}s{step - 1}\n" if step else ""
+            scripts[f"c{chain}s{step}"] = depends + f"insert into hits (name) values ('c{chain}s{step}')"
+    scripts["join"] = "-- depends: c0s5, c1s5, c2s5, c3s5\ninsert into hits (name) values ('join')"
+    engine, published = publish(tmp_path, scripts)
+
+    executed = run_workers(engine, published)
+
+    order = hit_order(engine)
+    assert executed == len(scripts)
+    assert sorted(order) == sorted(scripts)
+    position = {name: i for i, name in enumerate(order)}
+    graph = build_script_graph(published)
+    assert all(position[n] < position[e] for n, successors in graph.items() for e in successors)
+    assert set(queue_status(engine).values()) == {"done"}
+    with engine.connect() as connection:
+        claimed = connection.execute(text("select name, count(*) from dbmigrate_log group by name")).fetchall()
+    assert dict(claimed) == {name: 1 for name in scripts}
+
+
+def test_failure_stops_only_dependents(tmp_path):
+    scripts = {
+        "a": "insert into hits (name) values ('a')",
+        "b": "-- depends: a\ninsert into missing values ('b')",
+        "c": "-- depends: b\ninsert into hits (name) values ('c')",
+        "d": "-- depends: a\ninsert into hits (name) values ('d')",
+        "e": "-- depends: d\ninsert into hits (name) values ('e')",
+        "f": "insert into hits (name) values ('f')",
+    }
+    engine, published = publish(tmp_path, scripts)
+
+    run_workers(engine, published)
+
+    assert sorted(hit_order(engine)) == ["a", "d", "e", "f"]
+    assert queue_status(engine) == {"a": "done", "b": "failed", "c": "waiting", "d": "done", "e": "done",
+                                    "f": "done"}